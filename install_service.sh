@@ -86,8 +86,8 @@ sudo apt-get install -y \
   python3 \
   python3-venv \
   python3-pip \
-  fonts-dejavu-core \
   libjpeg-turbo8 \
+  libturbojpeg \
   zlib1g \
   libfreetype6
 
@@ -112,12 +112,31 @@ log "Upgrading pip (venv)..."
 "${PIP_BIN}" install --upgrade pip wheel setuptools
 
 log "Installing Python dependencies (venv)..."
+# PyTurboJPEG 2.x requires libjpeg-turbo >= 3.0; Ubuntu 22.04/24.04 ship libturbojpeg 2.1.x
 "${PIP_BIN}" install \
   fastapi \
   "uvicorn[standard]" \
   pillow \
+  "PyTurboJPEG<2" \
   watchdog
 
+# Optional: AOT-compile the server module with mypyc (COMPILE_MYPYC=1 ./install_service.sh).
+# The resulting mjpeg_server.*.so takes precedence over mjpeg_server.py at import time,
+# so it is rebuilt (or removed) on every run to never shadow an edited source file.
+rm -f "${PROJECT_DIR}"/mjpeg_server.*.so
+if [[ "${COMPILE_MYPYC:-0}" == "1" ]]; then
+  log "Compiling mjpeg_server.py with mypyc..."
+  sudo apt-get install -y build-essential python3-dev
+  "${PIP_BIN}" install mypy
+  if ( cd "${PROJECT_DIR}" && "${VENV_DIR}/bin/mypyc" --ignore-missing-imports mjpeg_server.py ); then
+    log "mypyc build OK: $(ls "${PROJECT_DIR}"/mjpeg_server.*.so)"
+  else
+    rm -f "${PROJECT_DIR}"/mjpeg_server.*.so
+    warn "mypyc build failed; the pure-Python mjpeg_server.py will be used."
+  fi
+  rm -rf "${PROJECT_DIR}/build"
+fi
+
 # ---------------------------
 # 3) Generate/merge env from base template (user-space)
 # ---------------------------
@@ -193,7 +212,7 @@ User=${INVOKING_USER}
 Group=${INVOKING_USER}
 
 WorkingDirectory=${PROJECT_DIR}
-ExecStart=${UVICORN_BIN} ${APP_MODULE} --host ${HOST} --port ${PORT}
+ExecStart=${UVICORN_BIN} ${APP_MODULE} --host ${HOST} --port ${PORT} --loop uvloop --http httptools
 
 Restart=on-failure
 RestartSec=2
@@ -1,21 +1,40 @@
 from __future__ import annotations
 
+import asyncio
+import base64
+import functools
+import gzip
+import inspect
+import itertools
+import queue
 import sys
 import threading
 import time
-from dataclasses import dataclass
 from io import BytesIO
 from pathlib import Path
-from typing import Generator, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
 
-from fastapi import FastAPI, Response
+from fastapi import FastAPI, Request, Response
 from fastapi.responses import StreamingResponse
 from PIL import Image
 from watchdog.events import FileSystemEventHandler
 from watchdog.observers import Observer
+from watchdog.observers.api import BaseObserver
+from watchdog.observers.polling import PollingObserver
+
+try:
+    from watchdog.observers.inotify import InotifyObserver
+except ImportError:
+    # inotify backend is Linux-only
+    InotifyObserver = None  # type: ignore[assignment,misc]
 
 import os
 
+try:
+    from turbojpeg import TJFLAG_PROGRESSIVE, TJSAMP_420, TurboJPEG
+except ImportError:
+    TurboJPEG = None
+
 # =============================================================================
 # Configuration
 # =============================================================================
@@ -25,43 +44,205 @@ FRAMES_ROCK_DIR_ABS: str = os.getenv("FRAMES_ROCK_DIR_ABS", "/tmp/mjpeg_frames2"
 TARGET_FPS: float = float(os.getenv("TARGET_FPS", "20.0"))
 MAX_FRAME_AGE_S: float = float(os.getenv("MAX_FRAME_AGE_S", "10.0"))
 
-# Placeholder frame resolution (shown when no real frames exist yet)
-NO_FRAME_WIDTH: int = 640
-NO_FRAME_HEIGHT: int = 480
+# Decode + re-encode JPEG inputs too (e.g. to strip EXIF); by default they are streamed as-is
+REENCODE: bool = os.getenv("REENCODE", "0") == "1"
+
+# Watch frame folders by polling even on local filesystems (1 = force)
+FORCE_POLLING: bool = os.getenv("MJPEG_FORCE_POLLING", "0") == "1"
+# One directory scan per stream frame period: polling never adds more than a frame of latency
+POLLING_TIMEOUT_S: float = 1.0 / TARGET_FPS if TARGET_FPS > 0.0 else 0.05
+
+# Seconds between two prune passes over the frame folders
+PRUNE_INTERVAL_S: float = 5.0
+
+# CPUs the decode threads are pinned to, e.g. "2" or "2,3" (empty = no pinning, Linux only)
+DECODE_CPUS: str = os.getenv("DECODE_CPUS", "")
+
+# Resend the current frame at least this often when the source is idle
+STREAM_KEEPALIVE_S: float = 1.0
+
+# Filesystems where inotify misses remote writes (fuse.* is matched by prefix)
+_POLLING_FSTYPES = frozenset(("cifs", "smb3", "smbfs", "nfs", "nfs4"))
 
 # =============================================================================
 # Shared state (latest JPEG) - one per source
 # =============================================================================
-@dataclass
 class LatestFrame:
-    lock: threading.Lock
-    jpeg_bytes: bytes
-    seq: int
-    path: Optional[Path]
+    """
+    Immutable (part, seq, path) snapshot, replaced as a whole on update.
+    part is the whole multipart part (headers + JPEG + trailer, empty when no frame
+    yet), built once per frame and sent as-is by every client.
+    Rebinding a single attribute is atomic under the GIL, so readers never see
+    a torn frame and no lock is needed. seq comes from an itertools.count, whose
+    next() is atomic too, so writers need no lock either.
+    Slotted (no instance dict): every client reads it on each iteration.
+    """
+
+    __slots__ = ("snapshot", "seq_counter", "loop", "changed")
+
+    def __init__(self, snapshot: Tuple[bytes, int, Optional[Path]]) -> None:
+        self.snapshot = snapshot
+        self.seq_counter: Iterator[int] = itertools.count(1)
+        # Set at startup: new frames wake stream clients through a per-source event,
+        # replaced on every frame (set() on the old one wakes all current waiters)
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.changed: Optional[asyncio.Event] = None
+
+
+latest1 = LatestFrame(snapshot=(b"", 0, None))
+latest2 = LatestFrame(snapshot=(b"", 0, None))
+
+
+# =============================================================================
+# JPEG codec (libjpeg-turbo when available, Pillow otherwise)
+# =============================================================================
+def _init_turbojpeg() -> Optional["TurboJPEG"]:
+    """
+    Single shared libjpeg-turbo handle; safe to reuse across threads on separate buffers.
+    Returns None when PyTurboJPEG or the native libturbojpeg library is missing.
+    """
+    if TurboJPEG is None:
+        return None
+    try:
+        return TurboJPEG()
+    except Exception as e:
+        print(f"Warning: libturbojpeg not available, falling back to Pillow ({e})", file=sys.stderr)
+        return None
+
 
+_tj = _init_turbojpeg()
 
-latest1 = LatestFrame(lock=threading.Lock(), jpeg_bytes=b"", seq=0, path=None)
-latest2 = LatestFrame(lock=threading.Lock(), jpeg_bytes=b"", seq=0, path=None)
+
+# Per-thread reusable encode buffer (decode threads, startup thread)
+_tls = threading.local()
+
+
+def _encode_jpeg(img: Image.Image) -> bytes:
+    """
+    Single Pillow JPEG encode entry point (PNG inputs, Pillow fallback).
+    Progressive: clients on slow links can render a usable preview from a
+    partially received frame. No optimize: the extra Huffman pass is not worth
+    it at TARGET_FPS. When Pillow is linked against jpegli's libjpeg-compatible
+    build (see README), every Pillow re-encode goes through it from here.
+    """
+    bio = getattr(_tls, "bio_out", None)
+    if bio is None:
+        bio = _tls.bio_out = BytesIO()
+    bio.seek(0)
+    bio.truncate()
+    # subsampling=2 -> 4:2:0 chroma, explicit rather than relying on Pillow's quality-dependent default
+    img.save(bio, format="JPEG", quality=85, subsampling=2, optimize=False, progressive=True)
+    return bio.getvalue()
+
+
+_IMAGE_EXTS = frozenset(("jpg", "jpeg", "png"))
+_JPEG_EXTS = frozenset(("jpg", "jpeg"))
+
+
+def _name_ext(name: str) -> str:
+    i = name.rfind(".")
+    return name[i + 1:].lower() if i >= 0 else ""
+
+
+def _is_candidate_name(name: str) -> bool:
+    return _name_ext(name) in _IMAGE_EXTS
 
 
 def _is_candidate_image(path: Path) -> bool:
-    suffix = path.suffix.lower()
-    return (suffix == ".jpg") or (suffix == ".jpeg") or (suffix == ".png")
+    return _is_candidate_name(path.name)
+
+
+def _walk_markers(buf: bytes) -> bool:
+    """
+    Walk the JPEG header segments (APPn, DQT, SOFn, DHT, ...) up to the first SOS,
+    by their length fields only: no Huffman/DCT work, a handful of index reads.
+    True iff every segment is well formed, a frame header (SOFn) precedes SOS and
+    EOI is the last two bytes (C-level rfind).
+    """
+    n = len(buf)
+    if buf[:2] != b"\xff\xd8":
+        return False
+    i = 2
+    seen_sof = False
+    while i + 1 < n:
+        if buf[i] != 0xFF:
+            return False
+        marker = buf[i + 1]
+        if marker == 0xFF:
+            # Fill byte before a marker
+            i += 1
+            continue
+        if (marker == 0x01) or (0xD0 <= marker <= 0xD7):
+            # Standalone markers (TEM, RSTn): no length field
+            i += 2
+            continue
+        if (marker in (0x00, 0xD8, 0xD9)) or (i + 3 >= n):
+            return False
+        seg_len = (buf[i + 2] << 8) | buf[i + 3]
+        if seg_len < 2:
+            return False
+        if marker == 0xDA:
+            # Entropy-coded data follows: only the final EOI is checked
+            return seen_sof and (buf.rfind(b"\xff\xd9") == n - 2)
+        if (0xC0 <= marker <= 0xCF) and (marker not in (0xC4, 0xC8, 0xCC)):
+            seen_sof = True
+        i += 2 + seg_len
+    return False
+
+
+def _validate_jpeg(buf: bytes) -> bool:
+    """
+    Cheap completeness check, no decode: SOI followed by a marker at the start,
+    well-formed header segments (_walk_markers), EOI as the last two bytes.
+    """
+    return (buf[:3] == b"\xff\xd8\xff") and _walk_markers(buf)
+
+
+def _read_file_bytes(path: Path) -> bytes:
+    """
+    Read a whole file with a single unbuffered os.read sized by fstat: one copy
+    from the page cache into the returned bytes, no BufferedReader in between.
+    A file truncated while being read yields short data, rejected by the caller's checks.
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        size = os.fstat(fd).st_size
+        data = os.read(fd, size) if size > 0 else b""
+    finally:
+        os.close(fd)
+    return data
 
 
 def _try_load_as_jpeg_bytes(path: Path, max_attempts: int = 5, sleep_s: float = 0.02) -> Optional[bytes]:
     """
     Defensive load to handle partially written files.
-    Reads the file, validates by decoding, then re-encodes to JPEG for streaming consistency.
-    Supports JPEG and PNG inputs; PNG with alpha is composited to RGB.
+    Complete JPEG files (SOI/EOI markers present) are streamed verbatim, without re-encoding;
+    a JPEG file with a missing EOI is still being written and is retried (REENCODE=1 too).
+    PNG inputs (or every input, with REENCODE=1) are validated by decoding, then re-encoded
+    to JPEG for streaming consistency; PNG with alpha is composited to RGB.
+    With REENCODE=1, JPEG inputs go through libjpeg-turbo when available; Pillow
+    handles everything else.
     """
+    is_jpeg = _name_ext(path.name) in _JPEG_EXTS
+
     for _ in range(max_attempts):
         try:
-            with path.open("rb") as f:
-                raw = f.read()
+            raw = _read_file_bytes(path)
+
+            # Every JPEG is marker-checked first: libjpeg-turbo only warns on a truncated
+            # file, so a partial write would otherwise be re-encoded and published
+            if is_jpeg and (not _validate_jpeg(raw)):
+                raise ValueError("incomplete JPEG (SOI/EOI missing)")
+
+            if is_jpeg and (not REENCODE):
+                return raw
+
+            if is_jpeg and (_tj is not None):
+                arr = _tj.decode(raw)
+                return _tj.encode(arr, quality=85, jpeg_subsample=TJSAMP_420, flags=TJFLAG_PROGRESSIVE)
 
             bio_in = BytesIO(raw)
-            img = Image.open(bio_in)
+            img: Image.Image = Image.open(bio_in)
             img.load()
 
             # Ensure JPEG-compatible mode (no alpha)
@@ -73,9 +254,7 @@ def _try_load_as_jpeg_bytes(path: Path, max_attempts: int = 5, sleep_s: float =
             elif img.mode != "RGB":
                 img = img.convert("RGB")
 
-            bio_out = BytesIO()
-            img.save(bio_out, format="JPEG", quality=85, optimize=False)
-            return bio_out.getvalue()
+            return _encode_jpeg(img)
         except Exception:
             print("Warning: failed to load/validate image as JPEG, retrying...", file=sys.stderr)
             time.sleep(sleep_s)
@@ -83,43 +262,176 @@ def _try_load_as_jpeg_bytes(path: Path, max_attempts: int = 5, sleep_s: float =
     return None
 
 
-def _generate_no_frame_jpeg(width: int, height: int, text: str = "NO FRAME") -> bytes:
-    """
-    Generate an in-memory JPEG placeholder with large white text on black background.
-    """
-    from PIL import ImageDraw, ImageFont
-
-    img = Image.new("RGB", (width, height), color=(0, 0, 0))
-    draw = ImageDraw.Draw(img)
+# Placeholder JPEG shown when no real frames exist yet: 640x480, "NO FRAME" in white
+# DejaVuSans-Bold (72 px) on black, quality=85, optimize=True, progressive.
+# Pre-rendered offline so that startup needs neither ImageDraw/ImageFont nor system fonts.
+_NO_FRAME_JPEG_B64: str = (
+    "/9j/4AAQSkZJRgABAQAAAQABAAD/2wBDAAUDBAQEAwUEBAQFBQUGBwwIBwcHBw8LCwkMEQ8SEhEP"
+    "ERETFhwXExQaFRERGCEYGh0dHx8fExciJCIeJBweHx7/2wBDAQUFBQcGBw4ICA4eFBEUHh4eHh4e"
+    "Hh4eHh4eHh4eHh4eHh4eHh4eHh4eHh4eHh4eHh4eHh4eHh4eHh4eHh4eHh7/wgARCAHgAoADASIA"
+    "AhEBAxEB/8QAHAABAAMBAQEBAQAAAAAAAAAAAAYHCAUEAwIB/8QAFAEBAAAAAAAAAAAAAAAAAAAA"
+    "AP/aAAwDAQACEAMQAAABpgAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA"
+    "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA"
+    "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA"
+    "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA"
+    "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA"
+    "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA"
+    "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA"
+    "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAFv8A3tf3mPvJc9MFhSCR"
+    "z8x2d489nWyIBzO1LzNke2NmwhgALFkMksIplNP4QGpNE52JxLvVbhTPysDqFAwjZmeytwe22eXf"
+    "RTNRbDz8VoCxZDJLCM3wPW2TT52DBdalUxnRlZmf7FrrRRG1zQ0hfkn3PM7AAAAAAAAAAAAAA179"
+    "PnDibZP0lEDoT+AT8x3ftBagJZmDTOOj+dTljY8U9nXMgAA0VYVe2EY3+ezBjNpPNheFuVHbhlD1"
+    "3H2CU05ZmaiPnfL/APVJKULN5EQuMxo7PGNFTmDTQ/lESaYlY3Rz67Lmrax64M/6KzroosLG+yBj"
+    "NsyDGbAAAAAAAAAAAAAAa9hsyhpVmj8caXPRJfR5zHels02mXvj/AGFVpQv971hFq/nsVKUaADRV"
+    "hV7YRmn8RD5kljQXhblR24V/LMye40PmHXFXFCXXS2szr0xb3PK2uLjdEp+m9X5RNEzSFzQyzrHG"
+    "13lr5KtelzY9cWPXBn/RWddFFhZp0tmk/Hh9whgAAAAAAAAAAAAANew3OgSqKjZnnx2H6/Iu22Md"
+    "fY2N+MneAvihvOAANFWFjMfT5gBeFuYzHd4QaMnmNxad84zFsVOC36gGzMxw8aKmmQQABseuM/ho"
+    "rOo2YxmNmfnGoAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA"
+    "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA"
+    "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA"
+    "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA"
+    "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA"
+    "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA"
+    "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA/8QALhAAAAUDAgUEAgEFAAAAAAAAAAME"
+    "BQYBAgcQNhEVFjQ1ExQgMxJAISIyUKCw/9oACAEBAAEFAv8AhnJoV6yfoYKyDEqoR2Nc3QGwj8C9"
+    "G1uWOJyOEXcOimzgqhFnB3Z17Xd8Y/GObN/Qw6GHQwWQz26MRpg5yV0MOhhfBjODnGHVFZqiT3q1"
+    "nQw6GCom9Op0j8Y5s39DCSRy9oTaR2M3uyPoYSON8nQiPxjmzf0MOhh0MFkM9uj/AHG3xwyG2aY7"
+    "8Cq7YMTaY6OCBGnQplyxMhIumTTS9sc0TkWcUWcVK2blK34Y/wBvisoYqV6oYg5yRlObRjXtAokb"
+    "MQe3uaBfpPW4tG5aY7Req46ZBReg7aY/2+HhHa4NpllxZicq889uS2IkIyP4QY/2+KyhipXqhiDn"
+    "JGU5t/cbfHKVBacKyC1SZzSGIF2O/Aqu2GO0lCmsSpyvcXYNa01vXEmWnEzFJRWwfDH+3wZ9muNe"
+    "0Eh87FbjLZCMl32/jpEEXsWKTLPYskfWe/Z5oi94xaY/2+rvqWlblVi1DPUHtXbHqD13F3WWoG0u"
+    "vEvI/hBj/b4M+z95t8dPq8GCMOVHNqyC2eqmx34FV2wiFKWxs+6tpGsXurdH3ClLkHwx/t/WdbbG"
+    "Ne0CyJNqpW0MDc2GOTkibin9zMdXER9FzB3GSFnEzG6z+K0pWj0jqgdBj/b7h2GOV/5FS5BzBljK"
+    "DlzPkZfxuJ+rI/hBj/b+s623+42+On+34a58vdTS7DSougvbUirthBzqGxy6lLrVZNyZVozEVStL"
+    "2dQhn+GP9vi+UPtL+qH0Ln11XJhjXtArlramWNrgkcSHZrRuZDoiNb1wxwi4WB6i7q4OjDGXVtdR"
+    "kdF/UMf7fcOwZltze52XW32Hm2EkuSq9cvJ+rI/hBj/b4vlD7S/qh9C59dVyb9xt8dP9viHOfMWk"
+    "Ku2GPnK1OrEujd6425mdqXxeLH2qRkJytsTfDH+3wZ9muNe0Eh87F3OrY6jIDb66K2lbrmZHRA1q"
+    "FBCazmzWObNYTnkKC39FzBoGP9vuHYCKyRCQ0S6RIlTWCfqyP4QY/wBvi+Lvtb+l30dLvv7rb46f"
+    "7fEXcuWO1P5oq7YUrWlY9LS62EHEnli++wu19liRLYoONUHfDH+3wZ9muNe0Eh86IM5e9ajLLTC2"
+    "diuJmAyMt9RZpjhb+JwmCL2T7j/b7h2HwJ+rI/hBj/b+t39v+FLMMKu5o58Djzjq/wC9t//EABQR"
+    "AQAAAAAAAAAAAAAAAAAAAKD/2gAIAQMBAT8BFh//xAAUEQEAAAAAAAAAAAAAAAAAAACg/9oACAEC"
+    "AQE/ARYf/8QASBAAAQICAwcPCwMCBwAAAAAAAgEDAAQQERITIjFBcXKxBRQgISM1UWFzgYOjwdHi"
+    "FTI0QEJSdJGhsuFTk/AkM0NQYmOCoLD/2gAIAQEABj8C/wDDObd8pVWxQqrh4o306jxQ5LvJUbZW"
+    "VoWa17cajULNytdsEflOuylf9jxU3OUZVxca4k54rm51EX3Wx7Vj0ibrzh7o/pZ4kXgcGP6lq8xO"
+    "Dtiuy13r243yjZuVrtjfTqPFG+nUeKN9Oo8UPTHlK1c21Oq4Yaky0PHru4XNUT+3ar+sb6dR4o30"
+    "6jxReaoiuVqrthXLmL7aYVaWurm2DUs35zhIKRvp1HijfTqPFDjDnntkorTrvXtxvlGzcrXbG+nU"
+    "eKG5hJnXAEVkryzZ+tJTRTOtxtWR3O1a+sb6dR4oCZ15drTlizc7OJePio13r243yjZuVrtjfTqP"
+    "FG+nUeKN9Oo8UPTHlK1c21Oq4Yaky+uy3JDooDVRof8AQ92L2fKg+XLQkO5i0BKhtDhMvdGBl5Zt"
+    "AAfrF2mnhaDjizYmlT3rCVaYU5R9DqwjgVOaCadBDAkqUVxxudayzu22vBxbHpSoq191R90endUf"
+    "dEy03OVmbRCKXI8NWSiczx0UGw7OWXAKySXMtpflC60mgdVMKY/lQEwyNkJhFVUT3kw0uTpJesDU"
+    "Ocv4pGaFLyYHbzk/iU9KVD8oXtjtLwLigmzSohWpUgGW0rMyQRTjhmVb81sastDPxKfaVHSlRVr7"
+    "qj7o9O6o+6JlpucrM2iEUuR4asnrstyQ6Ibuq1I4aAi8aw5LvJWDg2Vh2Ud85sqsvHB8uWhIdzFo"
+    "cm1S+eOrmT810OLa3FpbDScXDQ3NMrtiu2nvJwQDoLWJihJkiY2r5pLqPN+K9j0pUFl2E5njoonu"
+    "XPTEnc667pUuTHRJN+1Wa6KWRVKjc3Q+f8VRMPItR2bAZViXma6yUajzk2lh1RStxjdR5sP0p6Uo"
+    "dcHCIKqQzNN+a4NeSNcgm5zKWv8Aljg500vJdL3OWH5sv8MdpOFcUCq8EM/Ep9pUdKVBZfX5bkh0"
+    "Qqphuow28q7sF47lgdUmhv2r1zNg+XLQkO5i0SaJ7qr9VgyTCgquwklX9JEiYFcCtEn02PSlsH84"
+    "fuonM8dFDsy49NoTpqa1ENW3zRdWAIncFs1rVItzT4hwD7S80FMklkfNbHgSiXlqr1SrPNTDRLyA"
+    "r5u6HoTtiZkCX/dDQvZFSpWixMSuICvcmKjpSiY5ItEPanGu2O6N5McOiKVutboHNDLCpU4qW3M5"
+    "YZ1NBcG6OdkBkhn4lPtKjpS2D+cP3euy3JDoheVGEFwqmH7w+LgWCacG0BpUScKRMShYBmCUF4Rq"
+    "SqHcxaGExtqQL84UVwLDsufnNmorTKy5bRA0KFlxxNuriZL51bHpSoVNfY/0g7o9O6oO6Fl5qauj"
+    "RYUuYpoSiczx0UOyzjU1abNQVUFKtrni7SjqGOPhSFamWkVfZNPOGHJR7zgXDwpw0TGqBJh3MO3s"
+    "ofm7vKIhleopltJixQzNq/KKIrfohFtp8qJfVAUw7kfZ20dKUTHJFohibH2Cvk4UxwJgtYklaLBv"
+    "OLUACpEvFD025hcKvJAZIZ+JT7So6UqFTX2P9IO6PTuqDuhZeamro0WFLmKaE9dluSHRC8qNAo4V"
+    "b7F4fHwLQ7mLQcg6VQv7YZ35o19I2bvVftrtW+PLFnybNV8mtUBOapAgCC1i1hVV46B1MbK/cvne"
+    "JMWx6UqCy7Cczx0UT3LnpgHFLcTvXU4uGgdUGx3RjaPjD8QgolargiXlEwgN9lxxbmHm2RrqrMqk"
+    "jfKT/fGN8pP98Yuku826GC0BVpExLVXxDWGcmCjpSiY5ItFAS2qExc3GlsjeKtY4sEa11PfuhOlf"
+    "3qpUPPQGSGfiU+0qOlKhV1jj/VDvj0HrQ749B60O/wBdluSHRC8qNAOku4neO5OGK0h3MWitFqVI"
+    "GX1VWySbSPYlyxdGHQcDhFa6FMyQRTCqrBNSCpMv+97A98G88am4a1kq7HpSoLLsJzPHRRPcuemj"
+    "W7hbtLXuUcUE2aWhJKlThhZc0ralt2ReFPZ/nFQzIiu00ls8q/jTS/IEu0aXQMuP+cVDyIlQO7qH"
+    "P+a46UomOSLRsQyQz8Sn2lR0pbBf8mtNmQLwitUVeUZv94oreecczir/AO9v/8QAKxAAAQEHAwUB"
+    "AAEFAAAAAAAAAREAECExQVHwYYGhIHGRscFA0VCgsOHx/9oACAEBAAE/If8ABnd1/BFCo5S+3A6h"
+    "3CSgAKqi7VOlFaB5IeaXfkDFDXpXh2YTmuYlmaIBIO4l4arOUJ8qnYp1fAUFVT0VVdumqIKL2us6"
+    "bUDsfVCRfr/RpqyqgNSQ9HiG6UzfVAXQF6go/wCAoKql1RcSE4iipVi+JRYaCZk7eXVSHaUpFVTn"
+    "wFBVU9FVXbpqiCi9v7cHa7bBB+CcTZxOTS8iZ+bsJ8UhMrk1LGgxgsxNgJk9mRixPcVw1aF4bsmS"
+    "beVQDGDOBEdR9vXTKyk4gKIOusEfcCkYAi5krnKOiU6BQhQhkcKFCoEXVFwjg4UAhyUHy+L2otn6"
+    "8h8O9V4J49nyspORojg1GJeUYkE4dMETDak+gIoGldNd1TuVPQklZScQFEHXWCPuBSMAR/awdrDy"
+    "sylDmG7L3cDoWDbULKbghcJxNnRqHA7bhY4kqIIMd0/Dj/hPEKhaFl5zG5BQ06i4tX0krKTuQ6Ml"
+    "c7HXsYzUBC8fCujNwIhfBPe9J4QaPeaiWDtPZlmw4FwrYwgOXgPlZSZH6P1wFaRG03VGxUMmpdgG"
+    "Hydy0VVAqv8AEF8hkMYpN2Q8oxJyIEvSSspO5D9+DtYxQQBwRSbDZGAaa7iLafC1IwOx96OE4mzp"
+    "YnMM0pZHhjEqXrOqNgID001BHl0yspdGNsdkrnBEkKYSWDYX8QnGkgPDHBwihK9mZkk+ImX9q5ZF"
+    "c6OATdgECCTSeAItTg7svKiAZGYwCEGrGaCpiqceBDpWUmzlzao6XQHyh3LW1wzJmG4Xhv5eyAbQ"
+    "GzSU5e8h9ncNwvp6SVlLoxtn7cHa2c1aX4VJF8DwSwlBE2RIEMoqSRrKsqrYmzgHK9wVkcENJAEL"
+    "DhTukCjxyoQsj6VjLJCdxAcp0yspOAKAE66rjADFCFREBdkrnKJ2NqJCk6bMkYigohbEUZAxYKJc"
+    "H4w/aAJUg7h09M19BHKxdW2sAMA2gMZQQK4oQ5s5O4zrPKwdKyk2cuZQBIRVgHhWG1EBSIMi2g7o"
+    "AClp5nTZQbBA3C+npJWUnAFACddVxgBihCoiA/twdrZzV0sQKzD6jkF2Js4J4oFMgNNnoOJwqIMk"
+    "SA/X/Vd1AN5CDAtKPIoRsGjhiiQJUYge5jtr0yspO5DoyVzsdextQOKZXxPywIIBBUGRaPlJJkP1"
+    "7LFBFIAqWEAEahU4l5JYVPqA61lLY59bHPrREFAlrKGABVzQ5BiCChCENKyk2cucTQaU2cGUtmMT"
+    "RAOHI0CZTl3C+npJWUnAFASddSIKf2rg7WzmrjmkQTX8GPliACAgyIbE2cJnEKCJhjtAkIXsxI6+"
+    "mGiNIcOHUieMBuxiMgA8i/HlqhbBE9MrKTuQ6Mlc7HXuRlCBrOp+bMLGWOkBmGNXOV5op5Oor88Q"
+    "2eUnxaIcEci3rYmYlZSbOXdPC+npJWUujjH+ja4fJcMAIBFv9zLYNze399v/AP/aAAwDAQACAAMA"
+    "AAAQ888888888888888888888888888888888888888888888888888888888888888888888888"
+    "8888888888888888888888888888888888888888888888888888888888888888888888888888"
+    "8888888888888888888888888888888888888888888888888888888888888888888888888888"
+    "8888888888888888888888888888888888888888888888888888888888888888888888888888"
+    "8888888888888888888888888888888888888888888888888888888888888888888888888888"
+    "8888888888888888888888888888888888888888888888888888888888888888888888888888"
+    "8888888888888888888888888888888888888888888888888888888888888888888888888888"
+    "888888888888888888888888888888888888888UUg4MAc880808wY8U4808s448488888888888"
+    "888EgA8g8A88Uc88gk4kw0Es8Ios888888888888888UYos4kI88U0884Es4QYUY0oo848888888"
+    "8888888c8MsIgs88cc888cc8s8c88ss888888888888888888888888888888888888888888888"
+    "8888888888888888888888888888888888888888888888888888888888888888888888888888"
+    "8888888888888888888888888888888888888888888888888888888888888888888888888888"
+    "8888888888888888888888888888888888888888888888888888888888888888888888888888"
+    "8888888888888888888888888888888888888888888888888888888888888888888888888888"
+    "8888888888888888888888888888888888888888888888888888888888888888888888888888"
+    "8888888888888888888888888888888888888888888888888888888888888888/8QAFBEBAAAA"
+    "AAAAAAAAAAAAAAAAoP/aAAgBAwEBPxAWH//EABQRAQAAAAAAAAAAAAAAAAAAAKD/2gAIAQIBAT8Q"
+    "Fh//xAAqEAEAAQMEAQQBBAMBAAAAAAABEQAhMRBBUWFxIIGR8KEwQFCxoMHRsP/aAAgBAQABPxD/"
+    "AMM74B33uQmJiYKXDF9XGEapIk5GyO4jp7gyDzx2xG2a8Kh1wxOGNU0SUYK7t2WmWLDTOyY6e8VN"
+    "F/AB8f8AVHc5d04XPyUIny+TYtub2FbHqicvx98hOI9Hd3+4CrkxNkwxOHT5z86Zm3Ed69yJ2WC/"
+    "J/VULNKYjcHlQQ3fQct2IkjCugleh17uHLRTlHVraxOX4++QnEadJoMk69FQM2hDM6wc1BMAcKC8"
+    "pTCNO/6R0j3FsRvm16icvx98hOI9Hd3+4CrkxNkwxOH9+Ascdj7J/Z8NQX0HPR+aG+DCzu3Abo2l"
+    "qxUcE7jOTdf6il/xB14SnpBaVy9EKu4Gh2xCYlYtEO8Oy0mugtTIjSfdrZMSduyIXKMo+tuEEiJh"
+    "TRVuTd8VAhKhKh6KObPXcpBUI3FKZnjXhEhIShMRpDjmg1KBgEbl1ZpHRtMjwJ62QQQLBHztdr6T"
+    "cAdIlvxGV4kolWxwsidiJSvhk2IPlozyzxEN37RO31d24QSImFNFW5N3xUCEqEqH74BJMXsJovkH"
+    "kKFju1wRJwmR2QaUpOEYHuXSB50BfQc9BP2x9QPdPwcaReg1RhAcsk5iGxoWU7OEvnBbphyFdXZH"
+    "JPhKnA2JXcn5se/rb+y5fXRGHqHDygL1pRsFIN4Q+Wfh13CmiGMQ8IIcjSz56jGFOwvvUMFi03yD"
+    "xKeCVeYBCXQMfdON30DeDVkkliTiSkcI/KZCH7BOxq9jyQtBD3nveKss64sFBObrpWp08iLN+Wx7"
+    "00kvEZUF9Pdv7Ll/gADd1AhQwR2asMwOYzHiLhKm1XriCN75+ePDcaAX0HPQUASo5U/K1IrYjMiT"
+    "+qSiKrKu+q9IDPK/iFCOII8JP6rcWiaQlxIgLQltKvdK5byPLIAkFlJRJMNH/jEccK6cTg3SlVCo"
+    "lOUF3SqeXgNFXjbNixPEoOxQAAAgAsVeXKja8L2AvBrIG0HZgP7x206wg0gSETijKJ7ldfm87n0N"
+    "hrpqJrcA9Cg7tqVLNGJCY92Uhz0ohTCd4RTwp42QBbhT4Jjtr6Ph/C924oD7nmm94miXf8iLsrai"
+    "tczIKjpFKjA4DIvLFngDavoOehYYebAKuQMrLkSGlsmVN1L3idAVAFWwFKxVDho+VCt32uQH3Q9/"
+    "W3GCADCDoqyXQtisAhBs+ijLEousRXJHB6rM+yI2Zd1+HZaYkGAm2y87rO40GRjGh1+og9XG46WN"
+    "hML2mOlhOgvGNihDgYJMhSZpSjmTYQSKDIKEi5pi2CA2Sz5Iz0ehsM3TK5HymuHcO1Pg6uRhDpEa"
+    "LI4mGk+BqeAINnZPoQ8V9Hw9PduMEAGEHRVkuhbFYBCDZ/fAPuedG5ImkBe8ELvovoOej5HNgKHz"
+    "gPJb6R+CEiCErEAEQIDIlFboY/D0+6aFgRkN4KgsN0qQgWaP43KZ/khOgeHrb+y5fXRGTtnJlWhy"
+    "45RDeibAkGROas9Ky5B3LPh9qCEsqVGADlaDAGwPzszxFEVI2zFAoSgsdOr9/fF2w5mSkklqAYxJ"
+    "tue0gPS0zciESEfQ2GVPR4NVIi5ixYUPaD58EykBabEs6fR8PT3bnBIDlF0VM4IEv75APuedEcot"
+    "oKRDmLlAN6GAwokRwjX0HPQRFF4QuImGju+WgwRJ6Ijl3OXSrv3SaET6QjcqsUMem9vy3zYsdxhd"
+    "qduVb9GwFgALetv7Ll/QojLIWmrsfLAL8VzQnankJE6RSkbVBsCTnCzkcjtpcMghtHe7CTXZ8Apt"
+    "ZM7U/C0tZNAQSqTgAA4D1thvo+Hr7t/bcfwxU5x8gIa297AD4qGMcLz3T/nb/wD/2Q=="
+)
+
+NO_FRAME_JPEG: bytes = base64.b64decode(_NO_FRAME_JPEG_B64)
 
-    font_size = max(24, int(height * 0.15))
 
-    try:
-        font = ImageFont.truetype(
-            "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
-            font_size,
-        )
-    except Exception:
-        font = ImageFont.load_default()
-
-    try:
-        bbox = draw.textbbox((0, 0), text, font=font)
-        text_w = bbox[2] - bbox[0]
-        text_h = bbox[3] - bbox[1]
-    except Exception:
-        (text_w, text_h) = draw.textsize(text, font=font)
+# =============================================================================
+# MJPEG multipart framing
+# =============================================================================
+PART_BOUNDARY: bytes = b"--frame\r\n"
+PART_HEADER_CT: bytes = b"Content-Type: image/jpeg\r\n"
+PART_TRAILER: bytes = b"\r\n"
+_PART_PREFIX: bytes = PART_BOUNDARY + PART_HEADER_CT + b"Content-Length: "
 
-    pos = ((width - text_w) // 2, (height - text_h) // 2)
-    draw.text(pos, text, fill=(255, 255, 255), font=font)
 
-    bio = BytesIO()
-    img.save(bio, format="JPEG", quality=85, optimize=True)
-    return bio.getvalue()
+@functools.lru_cache(maxsize=1024)
+def _part_header(length: int) -> bytes:
+    """
+    Boundary + part headers for a payload of the given length.
+    Cached by length: frame sizes from the same producer recur often, though
+    spread over a range far wider than a handful of entries.
+    """
+    return _PART_PREFIX + b"%d\r\n\r\n" % length
 
 
-NO_FRAME_JPEG: bytes = _generate_no_frame_jpeg(NO_FRAME_WIDTH, NO_FRAME_HEIGHT)
+# Whole placeholder part, built once: idle streams yield it as-is
+NO_FRAME_PART: bytes = b"".join((_part_header(len(NO_FRAME_JPEG)), NO_FRAME_JPEG, PART_TRAILER))
 
 
+# =============================================================================
+# Frame lifecycle (prune, publish)
+# =============================================================================
 def prune_older_than_current(folder: Path, current_path: Optional[Path], max_age_s: float) -> None:
     """
     Delete images older than (mtime(current_path) - max_age_s).
@@ -129,41 +441,187 @@ def prune_older_than_current(folder: Path, current_path: Optional[Path], max_age
         return
 
     try:
-        current_mtime = current_path.stat().st_mtime
+        current_mtime_ns = current_path.stat().st_mtime_ns
     except FileNotFoundError:
         return
     except Exception:
         return
 
-    threshold = current_mtime - max_age_s
+    # Integer nanosecond comparisons, no float mtime conversion per entry
+    threshold_ns = current_mtime_ns - int(max_age_s * 1_000_000_000)
 
-    for p in folder.iterdir():
-        if (not p.is_file()) or (not _is_candidate_image(p)):
-            continue
+    # scandir: is_file()/stat() come from the cached DirEntry, no per-file Path objects
+    with os.scandir(folder) as it:
+        for e in it:
+            try:
+                if (not e.is_file(follow_symlinks=False)) or (not _is_candidate_name(e.name)):
+                    continue
+                if e.stat(follow_symlinks=False).st_mtime_ns < threshold_ns:
+                    os.unlink(e.path)
+            except FileNotFoundError:
+                pass
+            except Exception:
+                pass
+
+
+def _update_latest(latest: LatestFrame, jpeg: bytes, path: Path) -> None:
+    # join copies the payload once (chained + would copy it twice); every client then
+    # sends this single part instead of three chunks per frame
+    part = b"".join((_part_header(len(jpeg)), jpeg, PART_TRAILER))
+    latest.snapshot = (part, next(latest.seq_counter), path)
+
+    loop = latest.loop
+    if loop is not None:
         try:
-            if p.stat().st_mtime < threshold:
-                p.unlink()
-        except FileNotFoundError:
-            pass
-        except Exception:
+            loop.call_soon_threadsafe(_notify_new_frame, latest)
+        except RuntimeError:
+            # Event loop already closed (shutdown)
             pass
 
 
-def _update_latest(latest: LatestFrame, jpeg: bytes, path: Path) -> None:
-    with latest.lock:
-        latest.jpeg_bytes = jpeg
-        latest.seq += 1
-        latest.path = path
+def _notify_new_frame(latest: LatestFrame) -> None:
+    """Event-loop side of _update_latest: wake every client waiting for a new frame."""
+    changed = latest.changed
+    latest.changed = asyncio.Event()
+    if changed is not None:
+        changed.set()
 
 
 # =============================================================================
-# Watchdog handler (parametric on "latest")
+# Background thread scheduling (Linux, best-effort)
 # =============================================================================
-class NewImageHandler(FileSystemEventHandler):
+def _pin_to_decode_cpus() -> None:
+    """
+    Pin the calling thread to DECODE_CPUS: the decoder keeps its caches warm on
+    cores that are not busy with request handling.
+    """
+    if (not DECODE_CPUS) or (not hasattr(os, "sched_setaffinity")):
+        return
+    try:
+        cpus = {int(c) for c in DECODE_CPUS.split(",") if c.strip()}
+        # pid 0 = calling thread
+        os.sched_setaffinity(0, cpus)
+    except (ValueError, OSError) as e:
+        print(f"Warning: cannot pin decode thread to CPUs {DECODE_CPUS!r} ({e})", file=sys.stderr)
+
+
+def _set_batch_scheduling() -> None:
+    """Move the calling thread to SCHED_BATCH: its syscall bursts yield to the server."""
+    if not hasattr(os, "SCHED_BATCH"):
+        return
+    try:
+        os.sched_setscheduler(0, os.SCHED_BATCH, os.sched_param(0))
+    except OSError as e:
+        print(f"Warning: cannot set SCHED_BATCH on prune thread ({e})", file=sys.stderr)
+
+
+# =============================================================================
+# Decode thread (single-slot, latest-wins path queue)
+# =============================================================================
+class FrameDecoder:
+    """
+    Loads and publishes frames for one source on a dedicated thread.
+    The watcher only enqueues paths into a 1-slot queue where the newest path
+    replaces any pending one: producer bursts faster than the decode rate are
+    coalesced instead of piling up decodes.
+    """
+
     def __init__(self, folder: Path, latest: LatestFrame) -> None:
+        self._latest = latest
+        self._queue: "queue.Queue[Optional[Path]]" = queue.Queue(maxsize=1)
+        self._worker = threading.Thread(target=self._run, name=f"decoder-{folder.name}", daemon=True)
+
+    def start(self) -> None:
+        self._worker.start()
+
+    def stop(self) -> None:
+        self.submit(None)
+        self._worker.join()
+
+    def submit(self, path: Optional[Path]) -> None:
+        # Single submitter (the watcher thread): drop the pending path, keep the newest
+        while True:
+            try:
+                self._queue.put_nowait(path)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def _run(self) -> None:
+        _pin_to_decode_cpus()
+        while True:
+            path = self._queue.get()
+            if path is None:
+                return
+            self._process(path)
+
+    def _process(self, path: Path) -> None:
+        jpeg = _try_load_as_jpeg_bytes(path)
+        if jpeg is not None:
+            _update_latest(self._latest, jpeg, path)
+
+
+# =============================================================================
+# Prune thread (periodic, all sources)
+# =============================================================================
+class FramePruner:
+    """
+    Deletes expired frames of every source from one background thread, every
+    PRUNE_INTERVAL_S. A full directory scan per published frame (or per client)
+    would cost far more than the unlinks it performs; frames may outlive
+    MAX_FRAME_AGE_S by at most one interval.
+    """
+
+    def __init__(self, sources: Sequence[Tuple[Path, LatestFrame]]) -> None:
+        self._sources = list(sources)
+        self._stop = threading.Event()
+        self._worker = threading.Thread(target=self._run, name="pruner", daemon=True)
+
+    def start(self) -> None:
+        self._worker.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._worker.join()
+
+    def _run(self) -> None:
+        _set_batch_scheduling()
+        while not self._stop.wait(PRUNE_INTERVAL_S):
+            for folder, latest in self._sources:
+                try:
+                    prune_older_than_current(folder, latest.snapshot[2], MAX_FRAME_AGE_S)
+                except OSError as e:
+                    print(f"Warning: prune failed for {folder}: {e}", file=sys.stderr)
+
+
+# =============================================================================
+# Watchdog handler (parametric on the source decoder)
+# =============================================================================
+class NewImageHandler(FileSystemEventHandler):
+    """
+    With close_events (inotify), modified events are ignored: an in-place write
+    emits one per write(2), but a single close once the file is complete.
+    Created events are still handled: files moved in from an unwatched directory,
+    hard links and linkat(O_TMPFILE) only produce a create. The extra early event
+    of an in-place writer is absorbed by the (mtime_ns, size) dedup and the
+    decoder's marker check. Observers without close events (polling) fall back
+    to created/modified.
+    """
+
+    # Bound on the name -> (mtime_ns, size) dedup map
+    _LAST_SEEN_MAX: int = 256
+
+    def __init__(self, folder: Path, decoder: FrameDecoder, close_events: bool) -> None:
         super().__init__()
         self._folder = folder
-        self._latest = latest
+        self._decoder = decoder
+        self._close_events = close_events
+        # File state last submitted per name: events that do not change it
+        # (e.g. modified + closed for the same write) do not reach the decoder.
+        self._last_seen: Dict[str, Tuple[int, int]] = {}
 
     def on_created(self, event) -> None:
         if event.is_directory:
@@ -176,6 +634,11 @@ class NewImageHandler(FileSystemEventHandler):
         self._handle(Path(event.dest_path))
 
     def on_modified(self, event) -> None:
+        if event.is_directory or self._close_events:
+            return
+        self._handle(Path(event.src_path))
+
+    def on_closed(self, event) -> None:
         if event.is_directory:
             return
         self._handle(Path(event.src_path))
@@ -188,34 +651,112 @@ class NewImageHandler(FileSystemEventHandler):
         except ValueError:
             return
 
-        jpeg = _try_load_as_jpeg_bytes(path)
-        if jpeg is not None:
-            _update_latest(self._latest, jpeg, path)
-            prune_older_than_current(self._folder, path, MAX_FRAME_AGE_S)
+        try:
+            st = path.stat()
+        except OSError:
+            return
+        state = (st.st_mtime_ns, st.st_size)
+        if self._last_seen.get(path.name) == state:
+            return
+        if len(self._last_seen) >= self._LAST_SEEN_MAX:
+            self._last_seen.clear()
+        self._last_seen[path.name] = state
 
+        self._decoder.submit(path)
 
-def _start_watcher(folder: Path, latest: LatestFrame) -> Observer:
-    handler = NewImageHandler(folder, latest)
-    observer = Observer()
-    observer.schedule(handler, str(folder), recursive=False)
-    observer.start()
-    return observer
+
+def _folder_fstype(folder: Path) -> str:
+    """
+    Filesystem type of the mount containing folder (longest mount point match in
+    /proc/mounts; among mounts stacked on the same point, the last one listed is
+    the visible one, e.g. a cifs share over its systemd autofs trigger).
+    Returns "" when it cannot be determined (non-Linux, no procfs).
+    """
+    try:
+        resolved = str(folder.resolve())
+        with open("/proc/mounts", "r") as f:
+            mounts = [line.split() for line in f]
+    except Exception:
+        return ""
+
+    best_mnt = ""
+    best_type = ""
+    for fields in mounts:
+        if len(fields) < 3:
+            continue
+        # Mount points escape spaces as \040
+        mnt = fields[1].replace("\\040", " ")
+        if resolved == mnt or resolved.startswith(mnt.rstrip("/") + "/"):
+            if len(mnt) >= len(best_mnt):
+                best_mnt = mnt
+                best_type = fields[2]
+    return best_type
+
+
+def _needs_polling(folder: Path) -> bool:
+    """
+    inotify does not see writes made by other hosts on network filesystems (CIFS/NFS/FUSE):
+    those folders are watched by polling instead.
+    """
+    if FORCE_POLLING:
+        return True
+    fstype = _folder_fstype(folder)
+    return (fstype in _POLLING_FSTYPES) or fstype.startswith("fuse.")
+
+
+def _start_watcher(sources: Sequence[Tuple[Path, FrameDecoder]]) -> List[BaseObserver]:
+    """
+    One shared observer for all native folders: a single event-dispatch thread,
+    with one (cheap) watch scheduled per folder. Folders on network filesystems
+    share a separate PollingObserver.
+    """
+    native: List[Tuple[Path, FrameDecoder]] = []
+    polled: List[Tuple[Path, FrameDecoder]] = []
+    for folder, decoder in sources:
+        if _needs_polling(folder):
+            print(f"INFO: watching {folder} by polling", file=sys.stderr)
+            polled.append((folder, decoder))
+        else:
+            native.append((folder, decoder))
+
+    observers: List[BaseObserver] = []
+    for group, make_observer in ((native, Observer), (polled, lambda: PollingObserver(timeout=POLLING_TIMEOUT_S))):
+        if not group:
+            continue
+        observer = make_observer()
+        # watchdog's Observer falls back to other backends where inotify is unavailable
+        close_events = (InotifyObserver is not None) and isinstance(observer, InotifyObserver)
+        for folder, decoder in group:
+            observer.schedule(NewImageHandler(folder, decoder, close_events), str(folder), recursive=False)
+        observer.start()
+        observers.append(observer)
+    return observers
 
 
 def _bootstrap_folder(folder: Path, latest: LatestFrame) -> None:
     """
     Load newest existing frame from folder (if any) and prune older frames.
     """
-    candidates = sorted(
-        (p for p in folder.iterdir() if p.is_file() and _is_candidate_image(p)),
-        key=lambda p: p.stat().st_mtime,
-        reverse=True,
-    )
-    if candidates:
-        jpeg = _try_load_as_jpeg_bytes(candidates[0])
+    # Single pass keeping the max mtime: only the newest entry is needed, no sort
+    newest_entry: Optional[str] = None
+    newest_mtime_ns = -1
+    with os.scandir(folder) as it:
+        for e in it:
+            try:
+                if (not e.is_file(follow_symlinks=False)) or (not _is_candidate_name(e.name)):
+                    continue
+                mtime_ns = e.stat(follow_symlinks=False).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            if mtime_ns > newest_mtime_ns:
+                newest_mtime_ns = mtime_ns
+                newest_entry = e.path
+    if newest_entry is not None:
+        newest = Path(newest_entry)
+        jpeg = _try_load_as_jpeg_bytes(newest)
         if jpeg is not None:
-            _update_latest(latest, jpeg, candidates[0])
-        prune_older_than_current(folder, candidates[0], MAX_FRAME_AGE_S)
+            _update_latest(latest, jpeg, newest)
+        prune_older_than_current(folder, newest, MAX_FRAME_AGE_S)
 
 
 # =============================================================================
@@ -224,6 +765,21 @@ def _bootstrap_folder(folder: Path, latest: LatestFrame) -> None:
 app = FastAPI()
 
 
+def _request_endpoint(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Declare (request: Request) explicitly for an endpoint taking only the request.
+    FastAPI injects parameters based on annotations, which mypyc-compiled functions
+    do not expose (see COMPILE_MYPYC in install_service.sh).
+    """
+    wrapped = functools.partial(endpoint)
+    # Keep __name__/__doc__: route names (url_path_for) and OpenAPI operation ids use them
+    functools.update_wrapper(wrapped, endpoint)
+    wrapped.__signature__ = inspect.Signature(  # type: ignore[attr-defined]
+        [inspect.Parameter("request", inspect.Parameter.POSITIONAL_OR_KEYWORD, annotation=Request)]
+    )
+    return wrapped
+
+
 @app.on_event("startup")
 def _startup() -> None:
     folder1 = Path(FRAMES_OJBECT_DIR_ABS)
@@ -242,64 +798,114 @@ def _startup() -> None:
     _bootstrap_folder(folder1, latest1)
     _bootstrap_folder(folder2, latest2)
 
-    app.state.folder1 = folder1
-    app.state.folder2 = folder2
-    app.state.observer1 = _start_watcher(folder1, latest1)
-    app.state.observer2 = _start_watcher(folder2, latest2)
+    # Sync startup handlers run on the event loop thread
+    loop = asyncio.get_running_loop()
+    for latest in (latest1, latest2):
+        latest.changed = asyncio.Event()
+        latest.loop = loop
 
+    decoder1 = FrameDecoder(folder1, latest1)
+    decoder2 = FrameDecoder(folder2, latest2)
+    decoder1.start()
+    decoder2.start()
 
-@app.on_event("shutdown")
-def _shutdown() -> None:
-    obs1: Observer = app.state.observer1
-    obs2: Observer = app.state.observer2
+    app.state.decoders = [decoder1, decoder2]
+    app.state.observers = _start_watcher(((folder1, decoder1), (folder2, decoder2)))
 
-    obs1.stop()
-    obs2.stop()
+    pruner = FramePruner(((folder1, latest1), (folder2, latest2)))
+    pruner.start()
+    app.state.pruner = pruner
 
-    obs1.join()
-    obs2.join()
 
+@app.on_event("shutdown")
+def _shutdown() -> None:
+    observers: List[BaseObserver] = app.state.observers
 
-def _mjpeg_generator(
-    target_fps: float,
-    folder: Path,
-    latest: LatestFrame,
-) -> Generator[bytes, None, None]:
-    boundary = b"--frame\r\n"
-    header_ct = b"Content-Type: image/jpeg\r\n"
-    frame_interval = 1.0 / target_fps if target_fps > 0.0 else 0.05
+    for observer in observers:
+        observer.stop()
+    for observer in observers:
+        observer.join()
 
-    prune_every_n: int = 20
-    i: int = 0
+    decoders: List[FrameDecoder] = app.state.decoders
+    for decoder in decoders:
+        decoder.stop()
 
-    while True:
-        with latest.lock:
-            jpeg = latest.jpeg_bytes
-            path = latest.path
+    pruner: FramePruner = app.state.pruner
+    pruner.stop()
 
-        frame = jpeg if jpeg else NO_FRAME_JPEG
 
-        part = (
-            boundary
-            + header_ct
-            + f"Content-Length: {len(frame)}\r\n\r\n".encode("ascii")
-            + frame
-            + b"\r\n"
-        )
-        yield part
+# =============================================================================
+# MJPEG stream (one iterator per client)
+# =============================================================================
+class MjpegStream:
+    """
+    Async iterator of multipart parts for one client. Runs on the event loop:
+    every client is a coroutine sleeping on asyncio timers, not a threadpool
+    worker blocked in time.sleep for the whole stream lifetime.
+    Sends are capped at target_fps; once the cap allows, a new frame is sent as
+    soon as the decode thread publishes it (event wakeup). A frame already sent
+    to this client is not sent again, except as a keepalive every
+    STREAM_KEEPALIVE_S (connection liveness, browsers that only render a part
+    once the next boundary arrives).
+    (A class rather than an async generator, which mypyc cannot compile.)
+    """
 
-        i += 1
-        if (i % prune_every_n) == 0:
-            prune_older_than_current(folder, path, MAX_FRAME_AGE_S)
+    def __init__(self, request: Request, target_fps: float, latest: LatestFrame) -> None:
+        self._request = request
+        self._latest = latest
+        self._frame_interval = 1.0 / target_fps if target_fps > 0.0 else 0.05
+        # Deadline scheduling: time spent producing a part does not add to the period
+        self._next_t: Optional[float] = None
+        # seq of the last frame sent to this client
+        self._last_seq: int = -1
+
+    def __aiter__(self) -> MjpegStream:
+        return self
+
+    async def __anext__(self) -> bytes:
+        await self._wait_next_deadline()
+        await self._wait_new_frame(STREAM_KEEPALIVE_S)
+        if await self._request.is_disconnected():
+            raise StopAsyncIteration
+
+        part, seq, _ = self._latest.snapshot
+        self._last_seq = seq
+
+        # Shared part built by the decode thread: no per-client allocation
+        return part if part else NO_FRAME_PART
+
+    async def _wait_next_deadline(self) -> None:
+        if self._next_t is None:
+            self._next_t = time.monotonic()
+            return
 
-        time.sleep(frame_interval)
+        self._next_t += self._frame_interval
+        delay = self._next_t - time.monotonic()
+        if delay > 0.0:
+            await asyncio.sleep(delay)
+        else:
+            # Fell behind (slow client): resync instead of bursting to catch up
+            self._next_t = time.monotonic()
+            await asyncio.sleep(0)
+
+    async def _wait_new_frame(self, timeout: float) -> None:
+        # Grab the event before checking seq: both run on the loop, no wakeup can be missed
+        changed = self._latest.changed
+        if (changed is None) or (self._latest.snapshot[1] != self._last_seq):
+            return
+        try:
+            await asyncio.wait_for(changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        # Restart the cadence from this send, so the cap still holds after a wait
+        self._next_t = time.monotonic()
 
 
 @app.get("/stream/1")
-def stream1() -> Response:
-    folder1: Path = app.state.folder1
+@_request_endpoint
+async def stream1(request: Request) -> Response:
     return StreamingResponse(
-        _mjpeg_generator(TARGET_FPS, folder1, latest1),
+        MjpegStream(request, TARGET_FPS, latest1),
         media_type="multipart/x-mixed-replace; boundary=frame",
         headers={
             "Cache-Control": "no-cache, no-store, must-revalidate",
@@ -310,10 +916,10 @@ def stream1() -> Response:
 
 
 @app.get("/stream/2")
-def stream2() -> Response:
-    folder2: Path = app.state.folder2
+@_request_endpoint
+async def stream2(request: Request) -> Response:
     return StreamingResponse(
-        _mjpeg_generator(TARGET_FPS, folder2, latest2),
+        MjpegStream(request, TARGET_FPS, latest2),
         media_type="multipart/x-mixed-replace; boundary=frame",
         headers={
             "Cache-Control": "no-cache, no-store, must-revalidate",
@@ -322,9 +928,7 @@ def stream2() -> Response:
         },
     )
 
-@app.get("/")
-def index() -> Response:
-    html = """
+_INDEX_HTML_TEXT: str = """
     <!doctype html>
     <html>
       <head>
@@ -414,4 +1018,27 @@ def index() -> Response:
       </body>
     </html>
     """
-    return Response(content=html, media_type="text/html; charset=utf-8")
\ No newline at end of file
+
+# Encoded (and gzipped) once at import instead of on every GET
+_INDEX_HTML: bytes = _INDEX_HTML_TEXT.encode("utf-8")
+_INDEX_GZ: bytes = gzip.compress(_INDEX_HTML, compresslevel=6)
+
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        if coding.strip().lower() == "gzip":
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+@app.get("/")
+@_request_endpoint
+def index(request: Request) -> Response:
+    if _accepts_gzip(request.headers.get("accept-encoding", "")):
+        return Response(
+            content=_INDEX_GZ,
+            media_type="text/html; charset=utf-8",
+            headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"},
+        )
+    return Response(content=_INDEX_HTML, media_type="text/html; charset=utf-8", headers={"Vary": "Accept-Encoding"})
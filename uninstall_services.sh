@@ -61,6 +61,7 @@ if [[ "${PURGE_LOCAL_ARTIFACTS}" == "1" ]]; then
   # These are created by the installer / runtime. Remove only if present.
   rm -rf "${PROJECT_DIR}/.venv" || true
   rm -f  "${PROJECT_DIR}/config.env" || true
+  rm -f  "${PROJECT_DIR}"/mjpeg_server.*.so || true
 
   # Be conservative: remove only the default images directory inside repo
   if [[ -d "${PROJECT_DIR}/images" ]]; then